@@ -2,12 +2,14 @@
 import sys
 import signal
 from pymavlink import mavutil
-from collections import defaultdict
-import time
+from collections import Counter, defaultdict
+import selectors
 
 # Track messages by system ID and source port
 messages_by_vehicle = defaultdict(set)
-message_counts = defaultdict(lambda: defaultdict(int))
+message_counts = defaultdict(Counter)
+# (port, sysid) -> vehicle id string, formatted and interned once per vehicle
+vehicle_key_cache = {}
 running = True
 
 
@@ -19,28 +21,39 @@ def signal_handler(sig, frame):
 
 signal.signal(signal.SIGINT, signal_handler)
 
+PORTS = (14580, 14581, 14582)
+
 # Create MAVLink connections for each port
 connections = {
-    14580: mavutil.mavlink_connection('udpin:0.0.0.0:14580', source_system=255, dialect='common'),
-    14581: mavutil.mavlink_connection('udpin:0.0.0.0:14581', source_system=255, dialect='common'),
-    14582: mavutil.mavlink_connection('udpin:0.0.0.0:14582', source_system=255, dialect='common')
+    port: mavutil.mavlink_connection(f'udpin:0.0.0.0:{port}', source_system=255, dialect='common')
+    for port in PORTS
 }
 
-print("Listening for MAVLink messages on ports 14580, 14581, 14582...")
+# Block in the kernel until one of the UDP sockets has data
+selector = selectors.DefaultSelector()
+for port, conn in connections.items():
+    selector.register(conn.port, selectors.EVENT_READ, (port, conn))
+
+print(f"Listening for MAVLink messages on ports {', '.join(map(str, PORTS))}...")
 print("Press Ctrl+C to stop and show results\n")
 
 # Read MAVLink messages from all connections
 while running:
-    for port, conn in connections.items():
-        msg = conn.recv_match(blocking=False)
-        if msg:
+    for key, _ in selector.select(timeout=0.5):
+        port, conn = key.data
+        # Drain everything already buffered on the ready connection
+        while (msg := conn.recv_match(blocking=False)):
             msg_type = msg.get_type()
             if msg_type != 'BAD_DATA':
-                vehicle_id = f"Port_{port}_SysID_{msg.get_srcSystem()}"
+                vehicle_key = (port, msg.get_srcSystem())
+                vehicle_id = vehicle_key_cache.get(vehicle_key)
+                if vehicle_id is None:
+                    vehicle_id = sys.intern(f"Port_{port}_SysID_{vehicle_key[1]}")
+                    vehicle_key_cache[vehicle_key] = vehicle_id
                 messages_by_vehicle[vehicle_id].add(msg_type)
                 message_counts[vehicle_id][msg_type] += 1
 
-    time.sleep(0.001)  # Small delay to prevent CPU spinning
+selector.close()
 
 # Print results
 print("\n" + "="*70)
@@ -10,10 +10,14 @@ Port Architecture:
   - Telemetry (read from):   14580-14582 (UDP broadcast from PX4)
 """
 
+import asyncio
+import queue
+import threading
 import time
-import random
 import math
-import threading
+import traceback
+from collections import defaultdict
+import numpy as np
 from pymavlink import mavutil
 import sys
 
@@ -30,6 +34,57 @@ WAYPOINT_RADIUS = 0.002  # degrees (~200m)
 WAYPOINT_INTERVAL = 30  # seconds between waypoints
 CRUISE_SPEED = 5  # m/s
 
+# MAVLink constants resolved once at import
+FRAME_GLOBAL_REL_ALT = mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT
+CMD_ARM_DISARM = mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM
+CMD_NAV_TAKEOFF = mavutil.mavlink.MAV_CMD_NAV_TAKEOFF
+RESULT_ACCEPTED = mavutil.mavlink.MAV_RESULT_ACCEPTED
+MODE_FLAG_CUSTOM = mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+TYPE_MASK_POSITION_ONLY = 0b0000111111111000
+
+# Shared RNG so the whole swarm draws waypoints from one stream
+_rng = np.random.default_rng()
+
+# Status lines are queued and written by a single background thread so the
+# flight loop never blocks on a slow stdout
+_log_q = queue.Queue()
+
+
+def log(line):
+    """Queue a status line for the background writer"""
+    _log_q.put(line + '\n')
+
+
+def _log_writer():
+    """Write queued lines in batches, one write + flush per batch"""
+    while True:
+        batch = [_log_q.get()]
+        while True:
+            try:
+                batch.append(_log_q.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            sys.stdout.write(''.join(batch))
+            sys.stdout.flush()
+        finally:
+            for _ in batch:
+                _log_q.task_done()
+
+
+def start_log_writer():
+    """Start the background thread that writes log() lines"""
+    writer = threading.Thread(target=_log_writer, daemon=True, name="log-writer")
+    writer.start()
+    return writer
+
+
+def flush_log(writer):
+    """Wait until queued lines are written, or give up if the writer has died"""
+    with _log_q.all_tasks_done:
+        while _log_q.unfinished_tasks and writer.is_alive():
+            _log_q.all_tasks_done.wait(timeout=0.1)
+
 
 class DroneController:
     """Controls a single PX4 drone via MAVLink"""
@@ -44,6 +99,9 @@ class DroneController:
         
         self.connection = None  # Single connection for both read/write
         
+        # Coroutines waiting on incoming messages: msg type -> [(condition, future)]
+        self._waiters = defaultdict(list)
+        
         self.armed = False
         self.mode = "UNKNOWN"
         self.current_lat = base_lat
@@ -51,14 +109,48 @@ class DroneController:
         self.current_alt = 0
         self.running = True
         
-    def connect(self):
+        # Next waypoint handed out by the swarm planner, consumed by offboard_loop
+        self.pending_waypoint = None
+        
+    def _on_readable(self):
+        """Event loop callback: parse every queued message and wake matching waiters"""
+        while True:
+            msg = self.connection.recv_msg()
+            if msg is None:
+                return
+            
+            waiters = self._waiters.get(msg.get_type())
+            if not waiters:
+                continue
+            
+            for entry in list(waiters):
+                condition, future = entry
+                if future.done() or condition is None or condition(msg):
+                    waiters.remove(entry)
+                    if not future.done():
+                        future.set_result(msg)
+    
+    async def _wait_msg(self, msg_type, timeout, condition=None):
+        """Wait for the next message of msg_type (optionally matching condition), or None on timeout"""
+        future = asyncio.get_running_loop().create_future()
+        entry = (condition, future)
+        self._waiters[msg_type].append(entry)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if entry in self._waiters[msg_type]:
+                self._waiters[msg_type].remove(entry)
+    
+    async def connect(self):
         """Connect to PX4 instance via UDP"""
         try:
             # Use UDP connection (not udpin or udpout)
             # Format: udp:IP:PORT for bidirectional communication
             connection_string = f"udp:127.0.0.1:{self.cmd_port}"
             
-            print(f"{self.color} [Drone {self.drone_id}] Connecting to: {connection_string}")
+            log(f"{self.color} [Drone {self.drone_id}] Connecting to: {connection_string}")
             
             self.connection = mavutil.mavlink_connection(
                 connection_string,
@@ -67,51 +159,53 @@ class DroneController:
                 dialect='common'
             )
             
-            # Wait for heartbeat
-            print(f"{self.color} [Drone {self.drone_id}] Waiting for heartbeat on port {self.cmd_port}...")
-            msg = self.connection.wait_heartbeat(timeout=30)
+            # Parse incoming messages whenever the socket becomes readable
+            asyncio.get_running_loop().add_reader(self.connection.port.fileno(), self._on_readable)
+            
+            # Wait for heartbeat (pymavlink sets target_system/component as it arrives)
+            log(f"{self.color} [Drone {self.drone_id}] Waiting for heartbeat on port {self.cmd_port}...")
+            msg = await self._wait_msg('HEARTBEAT', timeout=30)
             
             if msg:
-                print(f"{self.color} [Drone {self.drone_id}] ✓ Connected!")
-                print(f"  System ID: {self.connection.target_system}")
-                print(f"  Component: {self.connection.target_component}")
-                print(f"  Autopilot: {msg.autopilot}")
-                print(f"  Type: {msg.type}")
+                log(f"{self.color} [Drone {self.drone_id}] ✓ Connected!")
+                log(f"  System ID: {self.connection.target_system}")
+                log(f"  Component: {self.connection.target_component}")
+                log(f"  Autopilot: {msg.autopilot}")
+                log(f"  Type: {msg.type}")
                 return True
             else:
-                print(f"{self.color} [Drone {self.drone_id}] ✗ No heartbeat received")
+                log(f"{self.color} [Drone {self.drone_id}] ✗ No heartbeat received")
                 return False
             
         except Exception as e:
-            print(f"{self.color} [Drone {self.drone_id}] ✗ Connection failed: {e}")
-            import traceback
-            traceback.print_exc()
+            log(f"{self.color} [Drone {self.drone_id}] ✗ Connection failed: {e}")
+            log(traceback.format_exc().rstrip())
             return False
     
-    def wait_for_gps(self, timeout=60):
+    async def wait_for_gps(self, timeout=60):
         """Wait for GPS 3D fix"""
-        print(f"{self.color} [Drone {self.drone_id}] Waiting for GPS fix...")
-        start_time = time.time()
+        log(f"{self.color} [Drone {self.drone_id}] Waiting for GPS fix...")
+        deadline = time.monotonic() + timeout
         
-        while time.time() - start_time < timeout:
-            msg = self.connection.recv_match(type='GPS_RAW_INT', blocking=True, timeout=3)
+        while time.monotonic() < deadline:
+            msg = await self._wait_msg('GPS_RAW_INT', timeout=3)
             if msg:
                 fix_type = msg.fix_type
                 sats = msg.satellites_visible
-                print(f"{self.color} [Drone {self.drone_id}] GPS: fix_type={fix_type}, sats={sats}")
+                log(f"{self.color} [Drone {self.drone_id}] GPS: fix_type={fix_type}, sats={sats}")
                 
                 if fix_type >= 3:  # 3D fix
-                    print(f"{self.color} [Drone {self.drone_id}] ✓ GPS 3D fix acquired ({sats} sats)")
+                    log(f"{self.color} [Drone {self.drone_id}] ✓ GPS 3D fix acquired ({sats} sats)")
                     self.current_lat = msg.lat / 1e7
                     self.current_lon = msg.lon / 1e7
                     return True
             else:
-                print(f"{self.color} [Drone {self.drone_id}] Waiting for GPS message...")
+                log(f"{self.color} [Drone {self.drone_id}] Waiting for GPS message...")
                     
-        print(f"{self.color} [Drone {self.drone_id}] ✗ GPS fix timeout")
+        log(f"{self.color} [Drone {self.drone_id}] ✗ GPS fix timeout")
         return False
     
-    def set_mode(self, mode_name):
+    async def set_mode(self, mode_name):
         """Set flight mode"""
         # PX4 custom mode mapping
         mode_mapping = {
@@ -128,15 +222,15 @@ class DroneController:
         }
         
         if mode_name not in mode_mapping:
-            print(f"{self.color} [Drone {self.drone_id}] Unknown mode: {mode_name}")
+            log(f"{self.color} [Drone {self.drone_id}] Unknown mode: {mode_name}")
             return False
         
         custom_mode = mode_mapping[mode_name]
         
         # PX4 requires base_mode with CUSTOM_MODE flag
-        base_mode = mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+        base_mode = MODE_FLAG_CUSTOM
         
-        print(f"{self.color} [Drone {self.drone_id}] Setting mode to {mode_name} (custom_mode={custom_mode})...")
+        log(f"{self.color} [Drone {self.drone_id}] Setting mode to {mode_name} (custom_mode={custom_mode})...")
         
         self.connection.mav.set_mode_send(
             self.connection.target_system,
@@ -144,56 +238,63 @@ class DroneController:
             custom_mode
         )
         
-        time.sleep(1)
+        # Verify mode change - returns as soon as a heartbeat reports the new mode
+        last_heartbeat = None
+        
+        def reports_mode(m):
+            nonlocal last_heartbeat
+            last_heartbeat = m
+            return m.custom_mode == custom_mode
         
-        # Verify mode change
-        msg = self.connection.recv_match(type='HEARTBEAT', blocking=True, timeout=5)
+        msg = await self._wait_msg('HEARTBEAT', timeout=5, condition=reports_mode)
         if msg:
-            current_mode = msg.custom_mode
-            print(f"{self.color} [Drone {self.drone_id}] Current custom_mode: {current_mode}")
-            if current_mode == custom_mode:
-                print(f"{self.color} [Drone {self.drone_id}] ✓ Mode set to {mode_name}")
-                self.mode = mode_name
-                return True
+            log(f"{self.color} [Drone {self.drone_id}] Current custom_mode: {msg.custom_mode}")
+            log(f"{self.color} [Drone {self.drone_id}] ✓ Mode set to {mode_name}")
+            self.mode = mode_name
+            return True
         
-        print(f"{self.color} [Drone {self.drone_id}] Mode change pending or failed")
+        if last_heartbeat is not None:
+            log(f"{self.color} [Drone {self.drone_id}] Current custom_mode: {last_heartbeat.custom_mode}")
+        log(f"{self.color} [Drone {self.drone_id}] Mode change pending or failed")
         return True  # Continue anyway
     
-    def arm(self):
+    async def arm(self):
         """Arm the drone"""
-        print(f"{self.color} [Drone {self.drone_id}] Arming...")
+        log(f"{self.color} [Drone {self.drone_id}] Arming...")
         
         self.connection.mav.command_long_send(
             self.connection.target_system,
             self.connection.target_component,
-            mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
+            CMD_ARM_DISARM,
             0,  # confirmation
             1,  # 1 to arm, 0 to disarm
             0, 0, 0, 0, 0, 0
         )
         
         # Wait for acknowledgment
-        ack = self.connection.recv_match(type='COMMAND_ACK', blocking=True, timeout=5)
-        if ack and ack.command == mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
-            if ack.result == mavutil.mavlink.MAV_RESULT_ACCEPTED:
-                print(f"{self.color} [Drone {self.drone_id}] ✓ Armed successfully")
+        ack = await self._wait_msg(
+            'COMMAND_ACK', timeout=5, condition=lambda m: m.command == CMD_ARM_DISARM
+        )
+        if ack:
+            if ack.result == RESULT_ACCEPTED:
+                log(f"{self.color} [Drone {self.drone_id}] ✓ Armed successfully")
                 self.armed = True
                 return True
             else:
-                print(f"{self.color} [Drone {self.drone_id}] ✗ Arming rejected (result={ack.result})")
+                log(f"{self.color} [Drone {self.drone_id}] ✗ Arming rejected (result={ack.result})")
                 return False
         else:
-            print(f"{self.color} [Drone {self.drone_id}] ✗ No arm acknowledgment")
+            log(f"{self.color} [Drone {self.drone_id}] ✗ No arm acknowledgment")
             return False
     
-    def takeoff(self, altitude):
+    async def takeoff(self, altitude):
         """Takeoff to specified altitude"""
-        print(f"{self.color} [Drone {self.drone_id}] Taking off to {altitude}m...")
+        log(f"{self.color} [Drone {self.drone_id}] Taking off to {altitude}m...")
         
         self.connection.mav.command_long_send(
             self.connection.target_system,
             self.connection.target_component,
-            mavutil.mavlink.MAV_CMD_NAV_TAKEOFF,
+            CMD_NAV_TAKEOFF,
             0,
             0, 0, 0, 0,
             self.current_lat,
@@ -201,19 +302,20 @@ class DroneController:
             altitude
         )
         
-        time.sleep(2)
-        print(f"{self.color} [Drone {self.drone_id}] ✓ Takeoff command sent")
+        await asyncio.sleep(2)
+        log(f"{self.color} [Drone {self.drone_id}] ✓ Takeoff command sent")
         return True
     
     def send_position_target(self, lat, lon, alt):
         """Send position setpoint in OFFBOARD mode"""
-        
+        # Packed fresh every time - each frame carries its own sequence number and CRC,
+        # so a cached frame can't be resent without PX4 counting the repeats as lost
         self.connection.mav.set_position_target_global_int_send(
             0,  # time_boot_ms (not used)
             self.connection.target_system,
             self.connection.target_component,
-            mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT,
-            0b0000111111111000,  # type_mask (position only)
+            FRAME_GLOBAL_REL_ALT,
+            TYPE_MASK_POSITION_ONLY,
             int(lat * 1e7),      # lat
             int(lon * 1e7),      # lon
             alt,                 # alt
@@ -222,35 +324,53 @@ class DroneController:
             0, 0                 # yaw, yaw_rate
         )
     
-    def generate_random_waypoint(self):
-        """Generate random waypoint around base position"""
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0.0005, WAYPOINT_RADIUS)
+    @classmethod
+    def generate_swarm_waypoints(cls, drones):
+        """Generate one random waypoint per drone around its base position as an (N, 3) lat/lon/alt array"""
+        n = len(drones)
+        base_lats = np.fromiter((d.base_lat for d in drones), dtype=float, count=n)
+        base_lons = np.fromiter((d.base_lon for d in drones), dtype=float, count=n)
         
-        lat = self.base_lat + distance * math.cos(angle)
-        lon = self.base_lon + distance * math.sin(angle)
-        alt = FLIGHT_ALTITUDE + random.uniform(-10, 10)
+        angles = _rng.uniform(0, 2 * math.pi, n)
+        distances = _rng.uniform(0.0005, WAYPOINT_RADIUS, n)
         
+        waypoints = np.empty((n, 3))
+        waypoints[:, 0] = base_lats + distances * np.cos(angles)
+        waypoints[:, 1] = base_lons + distances * np.sin(angles)
+        waypoints[:, 2] = FLIGHT_ALTITUDE + _rng.uniform(-10, 10, n)
+        return waypoints
+    
+    def generate_random_waypoint(self):
+        """Generate random waypoint around base position"""
+        lat, lon, alt = self.generate_swarm_waypoints([self])[0].tolist()
         return lat, lon, alt
     
-    def offboard_loop(self):
+    def next_waypoint(self):
+        """Take the planner's waypoint if one is pending, otherwise generate our own"""
+        if self.pending_waypoint is not None:
+            waypoint, self.pending_waypoint = self.pending_waypoint, None
+            return waypoint
+        return self.generate_random_waypoint()
+    
+    async def offboard_loop(self):
         """Maintain OFFBOARD mode with continuous setpoint stream"""
-        print(f"{self.color} [Drone {self.drone_id}] Starting OFFBOARD setpoint loop")
+        log(f"{self.color} [Drone {self.drone_id}] Starting OFFBOARD setpoint loop")
         
         waypoint_count = 0
-        target_lat, target_lon, target_alt = self.generate_random_waypoint()
-        last_waypoint_time = time.time()
+        target_lat, target_lon, target_alt = self.next_waypoint()
+        next_waypoint_deadline = time.monotonic() + WAYPOINT_INTERVAL
         
         while self.running:
             try:
                 # Check if it's time for a new waypoint
-                if time.time() - last_waypoint_time > WAYPOINT_INTERVAL:
-                    target_lat, target_lon, target_alt = self.generate_random_waypoint()
+                if time.monotonic() >= next_waypoint_deadline:
+                    target_lat, target_lon, target_alt = self.next_waypoint()
                     waypoint_count += 1
-                    last_waypoint_time = time.time()
+                    # Advance from the previous deadline so slow iterations don't accumulate drift
+                    next_waypoint_deadline += WAYPOINT_INTERVAL
                     
-                    print(f"{self.color} [Drone {self.drone_id}] Waypoint #{waypoint_count}: "
-                          f"({target_lat:.6f}, {target_lon:.6f}) @ {target_alt:.1f}m")
+                    log(f"{self.color} [Drone {self.drone_id}] Waypoint #{waypoint_count}: "
+                        f"({target_lat:.6f}, {target_lon:.6f}) @ {target_alt:.1f}m")
                 
                 # Send position setpoint at 2Hz (required for OFFBOARD)
                 self.send_position_target(target_lat, target_lon, target_alt)
@@ -261,65 +381,111 @@ class DroneController:
                 self.current_alt = target_alt
                 
                 # 2Hz setpoint rate
-                time.sleep(0.5)
+                await asyncio.sleep(0.5)
                 
             except Exception as e:
-                print(f"{self.color} [Drone {self.drone_id}] Error in OFFBOARD loop: {e}")
-                time.sleep(1)
+                log(f"{self.color} [Drone {self.drone_id}] Error in OFFBOARD loop: {e}")
+                await asyncio.sleep(1)
     
-    def run(self):
+    async def run(self):
         """Main execution"""
-        # Connect
-        if not self.connect():
-            print(f"{self.color} [Drone {self.drone_id}] Failed to connect.")
-            return
-        
-        # Wait for GPS
-        if not self.wait_for_gps():
-            print(f"{self.color} [Drone {self.drone_id}] Failed to get GPS fix.")
-            return
-        
-        # Start sending setpoints before arming (OFFBOARD requirement)
-        print(f"{self.color} [Drone {self.drone_id}] Starting pre-arm setpoint stream...")
-        target_lat, target_lon, target_alt = self.current_lat, self.current_lon, FLIGHT_ALTITUDE
-        
-        for _ in range(10):  # Send 10 setpoints before arming
-            self.send_position_target(target_lat, target_lon, target_alt)
-            time.sleep(0.1)
-        
-        # Set to OFFBOARD mode
-        self.set_mode('OFFBOARD')
-        time.sleep(1)
-        
-        # Arm
-        if not self.arm():
-            print(f"{self.color} [Drone {self.drone_id}] Failed to arm.")
+        try:
+            # Connect
+            if not await self.connect():
+                log(f"{self.color} [Drone {self.drone_id}] Failed to connect.")
+                return
+            
+            # Wait for GPS
+            if not await self.wait_for_gps():
+                log(f"{self.color} [Drone {self.drone_id}] Failed to get GPS fix.")
+                return
+            
+            # Start sending setpoints before arming (OFFBOARD requirement)
+            log(f"{self.color} [Drone {self.drone_id}] Starting pre-arm setpoint stream...")
+            target_lat, target_lon, target_alt = self.current_lat, self.current_lon, FLIGHT_ALTITUDE
+            
+            for _ in range(10):  # Send 10 setpoints before arming
+                self.send_position_target(target_lat, target_lon, target_alt)
+                await asyncio.sleep(0.1)
+            
+            # Set to OFFBOARD mode
+            await self.set_mode('OFFBOARD')
+            
+            # Arm
+            if not await self.arm():
+                log(f"{self.color} [Drone {self.drone_id}] Failed to arm.")
+                return
+            
+            # Continue OFFBOARD loop with random waypoints
+            await self.offboard_loop()
+        finally:
+            self.close()
+    
+    def close(self):
+        """Detach from the event loop and close the MAVLink connection"""
+        if self.connection is None:
             return
-        
-        # Continue OFFBOARD loop with random waypoints
-        self.offboard_loop()
+        try:
+            asyncio.get_running_loop().remove_reader(self.connection.port.fileno())
+        except RuntimeError:
+            pass
+        self.connection.close()
+        self.connection = None
     
     def stop(self):
         """Stop the drone"""
         self.running = False
-        print(f"{self.color} [Drone {self.drone_id}] Stopping...")
+        log(f"{self.color} [Drone {self.drone_id}] Stopping...")
+
+
+async def plan_swarm_waypoints(controllers):
+    """Hand every drone a fresh waypoint each interval, generated as one batch"""
+    while True:
+        waypoints = DroneController.generate_swarm_waypoints(controllers)
+        for controller, (lat, lon, alt) in zip(controllers, waypoints.tolist()):
+            controller.pending_waypoint = (lat, lon, alt)
+        await asyncio.sleep(WAYPOINT_INTERVAL)
+
+
+async def run_drone(controller):
+    """Run one controller, logging a failure as soon as it happens"""
+    try:
+        await controller.run()
+    except Exception as e:
+        log(f"{controller.color} [Drone {controller.drone_id}] ✗ Stopped with error: {e}")
+        log(traceback.format_exc().rstrip())
+        raise
+
+
+async def run_all(controllers):
+    """Run every controller concurrently on the current event loop"""
+    planner = asyncio.create_task(plan_swarm_waypoints(controllers))
+    try:
+        # return_exceptions keeps one drone's failure from cancelling the others
+        await asyncio.gather(
+            *(run_drone(controller) for controller in controllers),
+            return_exceptions=True
+        )
+    finally:
+        planner.cancel()
 
 
 def main():
     """Main function"""
-    print("=" * 60)
-    print("  PX4 Autonomous Flight Controller (FIXED)")
-    print("  3 Drones - UDP Connections")
-    print("=" * 60)
-    print()
-    print("Port Configuration:")
-    print("  📥 Command ports: 14540-14542")
-    print("  📤 Telemetry ports: 14580-14582")
-    print()
+    log_writer = start_log_writer()
+    
+    log("=" * 60)
+    log("  PX4 Autonomous Flight Controller (FIXED)")
+    log("  3 Drones - UDP Connections")
+    log("=" * 60)
+    log("")
+    log("Port Configuration:")
+    log("  📥 Command ports: 14540-14542")
+    log("  📤 Telemetry ports: 14580-14582")
+    log("")
     
     # Create drone controllers
     controllers = []
-    threads = []
     
     for drone_config in DRONES:
         controller = DroneController(
@@ -332,48 +498,29 @@ def main():
         )
         controllers.append(controller)
     
-    # Start each drone in separate thread
-    print("Starting autonomous flight for all drones...")
-    print()
-    
-    for controller in controllers:
-        thread = threading.Thread(target=controller.run, daemon=True)
-        thread.start()
-        threads.append(thread)
-        time.sleep(5)  # Stagger startup
-    
-    print()
-    print("=" * 60)
-    print("  All drones launched!")
-    print("=" * 60)
-    print()
-    print("Drones are flying autonomously in OFFBOARD mode")
-    print(f"Waypoint interval: {WAYPOINT_INTERVAL} seconds")
-    print(f"Flight altitude: {FLIGHT_ALTITUDE}m ± 10m")
-    print()
-    print("Press Ctrl+C to stop")
-    print()
+    log("Starting autonomous flight for all drones...")
+    log("")
+    log("Drones will fly autonomously in OFFBOARD mode")
+    log(f"Waypoint interval: {WAYPOINT_INTERVAL} seconds")
+    log(f"Flight altitude: {FLIGHT_ALTITUDE}m ± 10m")
+    log("")
+    log("Press Ctrl+C to stop")
+    log("")
     
-    # Keep main thread alive
+    # All drones share one event loop; each advances as soon as its own messages arrive
     try:
-        while True:
-            time.sleep(1)
-            
-            alive_count = sum(1 for t in threads if t.is_alive())
-            if alive_count == 0:
-                print("\nAll drone threads stopped. Exiting...")
-                break
+        asyncio.run(run_all(controllers))
+        log("\nAll drones stopped. Exiting...")
                 
     except KeyboardInterrupt:
-        print("\n\nStopping all drones...")
+        log("\n\nStopping all drones...")
         for controller in controllers:
             controller.stop()
         
-        print("Waiting for threads to finish...")
-        for thread in threads:
-            thread.join(timeout=5)
-        
-        print("Done!")
+        log("Done!")
+    finally:
+        # Everything goes through the queue, so this keeps the output in order
+        flush_log(log_writer)
 
 
 if __name__ == "__main__":
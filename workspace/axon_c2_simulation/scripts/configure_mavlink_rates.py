@@ -4,22 +4,23 @@ Configure MAVLink stream rates for multiple PX4 SITL instances
 Sets all telemetry streams to 30Hz
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pymavlink import mavutil
-import time
 import sys
 
 def configure_rates(connection_string, rate_hz=1, timeout=10):
     """Configure MAVLink stream rates for a single vehicle"""
     try:
-        print(f"Connecting to {connection_string}...", end=" ")
-        mav = mavutil.mavlink_connection(connection_string)
+        # Vehicles are configured concurrently, so every line names its connection
+        print(f"[{connection_string}] Connecting...")
+        mav = mavutil.mavlink_connection(connection_string, dialect='common')
         
         # Wait for heartbeat with timeout
         if not mav.wait_heartbeat(timeout=timeout):
-            print("❌ No heartbeat received")
+            print(f"[{connection_string}] ❌ No heartbeat received")
             return False
         
-        print(f"✓ Connected (System ID: {mav.target_system})")
+        print(f"[{connection_string}] ✓ Connected (System ID: {mav.target_system})")
         
         # Request all data streams at specified rate
         mav.mav.request_data_stream_send(
@@ -30,7 +31,7 @@ def configure_rates(connection_string, rate_hz=1, timeout=10):
             1  # 1 = start streaming, 0 = stop streaming
         )
         
-        print(f"  ✓ Configured all streams to {rate_hz}Hz")
+        print(f"[{connection_string}]   ✓ Configured all streams to {rate_hz}Hz")
         
         # Also set individual important streams explicitly
         streams = [
@@ -49,11 +50,11 @@ def configure_rates(connection_string, rate_hz=1, timeout=10):
                 1
             )
         
-        print(f"  ✓ Configured individual streams")
+        print(f"[{connection_string}]   ✓ Configured individual streams")
         return True
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        print(f"[{connection_string}] ❌ Error: {e}")
         return False
 
 def main():
@@ -68,20 +69,20 @@ def main():
     base_port = 14540
     rate_hz = 30
     
-    success_count = 0
+    connection_strings = [f'udp:127.0.0.1:{base_port + i}' for i in range(num_vehicles)]
+    for i, connection_string in enumerate(connection_strings):
+        print(f"[Drone {i+1}] Configuring vehicle on port {base_port + i}")
+    print()
     
-    # Configure each vehicle
-    for i in range(num_vehicles):
-        port = base_port + i
-        connection_string = f'udp:127.0.0.1:{port}'
-        
-        print(f"[Drone {i+1}] Configuring vehicle on port {port}")
-        
-        if configure_rates(connection_string, rate_hz=rate_hz):
-            success_count += 1
-        
-        print()
-        time.sleep(0.5)  # Small delay between vehicles
+    # Configure all vehicles in parallel - each SITL instance is independent,
+    # so total time is bounded by the slowest vehicle rather than the sum
+    with ThreadPoolExecutor(max_workers=num_vehicles) as executor:
+        results = list(executor.map(
+            lambda conn_str: configure_rates(conn_str, rate_hz=rate_hz),
+            connection_strings
+        ))
+    success_count = sum(results)
+    print()
     
     print("=" * 50)
     print(f"Configuration complete: {success_count}/{num_vehicles} vehicles configured")
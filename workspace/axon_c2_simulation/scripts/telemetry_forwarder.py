@@ -8,25 +8,180 @@ Architecture:
 - Forwarder receives from each port and filters by system ID
 - Only forwards messages matching the expected system ID to corresponding output port
 - Parser reads from 14550-14552 (clean, filtered data per drone)
+
+Datagrams are forwarded as raw bytes; only the MAVLink frame headers are
+inspected to read the system ID, so no message decoding or CRC work is done.
 """
 
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
 import socket
+import sys
 import threading
 import time
 import logging
-from typing import Dict
-from pymavlink import mavutil
+import logging.handlers
+import queue
+from typing import Dict, Optional
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# MAVLink framing constants
+MAVLINK_V1_STX = 0xFE
+MAVLINK_V2_STX = 0xFD
+MAVLINK_V1_OVERHEAD = 8   # 6 byte header + 2 byte checksum
+MAVLINK_V2_OVERHEAD = 12  # 10 byte header + 2 byte checksum
+MAVLINK_V2_SIGNATURE_LEN = 13
+MAVLINK_IFLAG_SIGNED = 0x01
+
+
+def iter_mavlink_frames(data):
+    """Yield (start, end, sysid) for each MAVLink frame packed in a datagram"""
+    offset = 0
+    size = len(data)
+    while offset + 6 <= size:
+        stx = data[offset]
+        if stx == MAVLINK_V2_STX:
+            end = offset + MAVLINK_V2_OVERHEAD + data[offset + 1]
+            if data[offset + 2] & MAVLINK_IFLAG_SIGNED:
+                end += MAVLINK_V2_SIGNATURE_LEN
+            sysid = data[offset + 5]
+        elif stx == MAVLINK_V1_STX:
+            end = offset + MAVLINK_V1_OVERHEAD + data[offset + 1]
+            sysid = data[offset + 3]
+        else:
+            # Not a MAVLink frame - nothing after this point can be trusted
+            return
+        
+        if end > size:
+            return
+        
+        yield offset, end, sysid
+        offset = end
+
+
+# Linux recvmmsg()/sendmmsg() move a whole burst of datagrams in one syscall
+class _IoVec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IoVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+def _load_libc():
+    """Return libc if it provides recvmmsg and sendmmsg, otherwise None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.recvmmsg.argtypes = [
+            ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p
+        ]
+        libc.recvmmsg.restype = ctypes.c_int
+        libc.sendmmsg.argtypes = [
+            ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int
+        ]
+        libc.sendmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class _RecvBatch:
+    """Preallocated buffers and mmsghdr array for recvmmsg"""
+    
+    def __init__(self, count: int, bufsize: int):
+        self.count = count
+        self.buffers = [ctypes.create_string_buffer(bufsize) for _ in range(count)]
+        self.iovecs = (_IoVec * count)()
+        self.hdrs = (_MMsgHdr * count)()
+        for i, buf in enumerate(self.buffers):
+            self.iovecs[i].iov_base = ctypes.addressof(buf)
+            self.iovecs[i].iov_len = bufsize
+            self.hdrs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            self.hdrs[i].msg_hdr.msg_iovlen = 1
+    
+    def recv(self, fd: int) -> list:
+        """Receive up to `count` datagrams without blocking"""
+        n = _libc.recvmmsg(fd, self.hdrs, self.count, socket.MSG_DONTWAIT, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, os.strerror(err))
+        return [ctypes.string_at(self.buffers[i], self.hdrs[i].msg_len) for i in range(n)]
+
+
+class _SendBatch:
+    """Preallocated mmsghdr array for sendmmsg on a connected socket"""
+    
+    def __init__(self, count: int):
+        self.count = count
+        self.iovecs = (_IoVec * count)()
+        self.hdrs = (_MMsgHdr * count)()
+        for i in range(count):
+            self.hdrs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            self.hdrs[i].msg_hdr.msg_iovlen = 1
+    
+    def send(self, fd: int, datagrams: list):
+        """Send up to `count` datagrams, retrying until the kernel accepts them all
+
+        Raises ConnectionRefusedError if nothing is listening on the peer port.
+        """
+        n = len(datagrams)
+        # Keep the char pointers alive for the duration of the syscall
+        pointers = [ctypes.c_char_p(data) for data in datagrams]
+        for i in range(n):
+            self.iovecs[i].iov_base = ctypes.cast(pointers[i], ctypes.c_void_p)
+            self.iovecs[i].iov_len = len(datagrams[i])
+        
+        sent = 0
+        while sent < n:
+            ret = _libc.sendmmsg(fd, ctypes.byref(self.hdrs[sent]), n - sent, 0)
+            if ret < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err == errno.ECONNREFUSED:
+                    raise ConnectionRefusedError(err, os.strerror(err))
+                raise OSError(err, os.strerror(err))
+            sent += ret
+
 
 class SystemIdTelemetryForwarder:
     """Forwards MAVLink telemetry filtering by system ID"""
     
+    RECV_BUFSIZE = 65535
+    BATCH_SIZE = 32
+    STATS_INTERVAL = 10.0
+    RECV_SOCKET_BUFFER = 4 << 20  # absorb PX4 bursts while this thread is descheduled
+    SEND_SOCKET_BUFFER = 1 << 20
+    
     def __init__(self, px4_port: int, broadcast_port: int, expected_sysid: int, drone_id: int):
         self.px4_port = px4_port
         self.broadcast_port = broadcast_port
@@ -34,9 +189,9 @@ class SystemIdTelemetryForwarder:
         self.drone_id = drone_id
         self.running = False
         self.thread = None
-        
-        # MAVLink connection for parsing
-        self.mav_conn = None
+        self._stats_timer: Optional[threading.Timer] = None
+        self._recv_batch: Optional[_RecvBatch] = None
+        self._send_batch: Optional[_SendBatch] = None
         
         # Statistics
         self.packets_received = 0
@@ -44,7 +199,7 @@ class SystemIdTelemetryForwarder:
         self.packets_filtered = 0
         self.bytes_forwarded = 0
         self.start_time = None
-        self.system_ids_seen = set()
+        self._seen_bitmap = 0  # bit N set once system ID N has been seen
         
     def start(self):
         """Start the forwarder thread"""
@@ -53,8 +208,11 @@ class SystemIdTelemetryForwarder:
             
         self.running = True
         self.start_time = time.time()
+        if _libc is not None:
+            self._send_batch = _SendBatch(self.BATCH_SIZE)
         self.thread = threading.Thread(target=self._forward_loop, daemon=True)
         self.thread.start()
+        self._schedule_stats()
         logger.info(
             f"Drone {self.drone_id}: Forwarder started "
             f"(PX4:{self.px4_port} -> Broadcast:{self.broadcast_port}, "
@@ -64,32 +222,115 @@ class SystemIdTelemetryForwarder:
     def stop(self):
         """Stop the forwarder"""
         self.running = False
+        if self._stats_timer:
+            self._stats_timer.cancel()
         if self.thread:
             self.thread.join(timeout=2)
         logger.info(f"Drone {self.drone_id}: Forwarder stopped")
     
+    @property
+    def system_ids_seen(self) -> list:
+        """Sorted list of every system ID seen on the PX4 port"""
+        bitmap = self._seen_bitmap
+        return [sysid for sysid in range(256) if bitmap & (1 << sysid)]
+    
+    def _filter_datagram(self, data: bytes) -> bytes:
+        """Return the part of a datagram that belongs to the expected system ID"""
+        spans = []
+        for start, end, sysid in iter_mavlink_frames(data):
+            self.packets_received += 1
+            self._seen_bitmap |= 1 << sysid
+            
+            # Filter: only forward messages from our expected system ID
+            if sysid == self.expected_sysid:
+                spans.append((start, end))
+            else:
+                # This message is from a different system ID - filter it out
+                self.packets_filtered += 1
+        
+        self.packets_forwarded += len(spans)
+        
+        if not spans:
+            return b''
+        if len(spans) == 1 and spans[0] == (0, len(data)):
+            # Common case: whole datagram is one matching frame
+            return data
+        return b''.join(data[start:end] for start, end in spans)
+    
+    def _recv_datagrams(self, recv_sock: socket.socket) -> list:
+        """Read every datagram currently queued on the socket, up to BATCH_SIZE"""
+        if self._recv_batch is not None:
+            return self._recv_batch.recv(recv_sock.fileno())
+        
+        # Portable fallback: one recv per datagram until the queue is empty
+        datagrams = []
+        while len(datagrams) < self.BATCH_SIZE:
+            try:
+                datagrams.append(recv_sock.recv(self.RECV_BUFSIZE))
+            except BlockingIOError:
+                break
+        return datagrams
+    
+    def _drain_batch(self, recv_sock: socket.socket, send_sock: socket.socket) -> int:
+        """Receive a batch of datagrams, filter them and forward the survivors"""
+        datagrams = self._recv_datagrams(recv_sock)
+        outgoing = []
+        for data in datagrams:
+            msg_bytes = self._filter_datagram(data)
+            if msg_bytes:
+                outgoing.append(msg_bytes)
+                self.bytes_forwarded += len(msg_bytes)
+        
+        if not outgoing:
+            return len(datagrams)
+        
+        # Forward to broadcast port
+        try:
+            if self._send_batch is not None:
+                self._send_batch.send(send_sock.fileno(), outgoing)
+            else:
+                for msg_bytes in outgoing:
+                    send_sock.send(msg_bytes)
+        except ConnectionRefusedError:
+            # Connected UDP sockets report ICMP port-unreachable: no parser is
+            # listening on the broadcast port yet, so this batch has nowhere to go
+            pass
+        return len(datagrams)
+    
     def _forward_loop(self):
         """Main forwarding loop with system ID filtering"""
-        # Create MAVLink connection to parse messages
-        conn_str = f'udp:127.0.0.1:{self.px4_port}'
-        self.mav_conn = mavutil.mavlink_connection(conn_str, source_system=255)
+        # Receive raw datagrams from PX4 - no MAVLink parsing needed
+        recv_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        recv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RECV_SOCKET_BUFFER)
+        recv_sock.bind(('127.0.0.1', self.px4_port))
+        recv_sock.setblocking(False)
+        
+        if _libc is not None:
+            self._recv_batch = _RecvBatch(self.BATCH_SIZE, self.RECV_BUFSIZE)
         
         # Create socket to broadcast filtered telemetry
         send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.SEND_SOCKET_BUFFER)
+        # Fix the destination once so each forward is a plain send()
+        send_sock.connect(('127.0.0.1', self.broadcast_port))
         
+        # The kernel silently caps these at net.core.rmem_max / wmem_max
+        logger.info(
+            f"Drone {self.drone_id}: Socket buffers "
+            f"rcvbuf={recv_sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} "
+            f"sndbuf={send_sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)} bytes"
+        )
         logger.info(f"Drone {self.drone_id}: Listening on 127.0.0.1:{self.px4_port}")
         logger.info(f"Drone {self.drone_id}: Broadcasting to 127.0.0.1:{self.broadcast_port}")
         logger.info(f"Drone {self.drone_id}: Filtering for system ID {self.expected_sysid}")
         
         consecutive_timeouts = 0
-        last_stats_time = time.time()
         
         while self.running:
             try:
-                # Receive MAVLink message with timeout
-                msg = self.mav_conn.recv_match(blocking=True, timeout=1.0)
-                
-                if msg is None:
+                # Wait up to 1s for data, then drain the whole burst
+                ready, _, _ = select.select([recv_sock], [], [], 1.0)
+                if not ready:
                     consecutive_timeouts += 1
                     if consecutive_timeouts >= 10:
                         logger.warning(
@@ -100,39 +341,29 @@ class SystemIdTelemetryForwarder:
                 
                 # Reset timeout counter
                 consecutive_timeouts = 0
-                self.packets_received += 1
-                
-                # Get the system ID from the message
-                msg_sysid = msg.get_srcSystem()
-                self.system_ids_seen.add(msg_sysid)
                 
-                # Filter: only forward messages from our expected system ID
-                if msg_sysid == self.expected_sysid:
-                    # Get the raw bytes of the message
-                    msg_bytes = msg.get_msgbuf()
-                    
-                    # Forward to broadcast port
-                    send_sock.sendto(msg_bytes, ('127.0.0.1', self.broadcast_port))
-                    
-                    # Update statistics
-                    self.packets_forwarded += 1
-                    self.bytes_forwarded += len(msg_bytes)
-                else:
-                    # This message is from a different system ID - filter it out
-                    self.packets_filtered += 1
-                
-                # Log stats periodically
-                current_time = time.time()
-                if current_time - last_stats_time >= 10.0:
-                    self._log_stats()
-                    last_stats_time = current_time
+                self._drain_batch(recv_sock, send_sock)
                 
             except Exception as e:
                 logger.error(f"Drone {self.drone_id}: Forward error: {e}")
                 time.sleep(0.1)
         
+        recv_sock.close()
         send_sock.close()
     
+    def _schedule_stats(self):
+        """Arm the timer that logs stats every STATS_INTERVAL seconds"""
+        self._stats_timer = threading.Timer(self.STATS_INTERVAL, self._periodic_stats)
+        self._stats_timer.daemon = True
+        self._stats_timer.start()
+    
+    def _periodic_stats(self):
+        """Log stats off the forwarding thread, then reschedule"""
+        if not self.running:
+            return
+        self._log_stats()
+        self._schedule_stats()
+    
     def _log_stats(self):
         """Log periodic statistics"""
         duration = time.time() - self.start_time if self.start_time else 0
@@ -144,7 +375,7 @@ class SystemIdTelemetryForwarder:
                 f"Drone {self.drone_id}: "
                 f"Fwd={self.packets_forwarded} ({forward_rate:.1f} Hz), "
                 f"Filtered={self.packets_filtered} ({filter_pct:.1f}%), "
-                f"SysIDs seen={sorted(self.system_ids_seen)}"
+                f"SysIDs seen={self.system_ids_seen}"
             )
     
     def get_stats(self) -> Dict:
@@ -160,7 +391,7 @@ class SystemIdTelemetryForwarder:
             'bytes_forwarded': self.bytes_forwarded,
             'forward_rate_hz': self.packets_forwarded / duration if duration > 0 else 0,
             'bandwidth_kbps': (self.bytes_forwarded * 8 / 1024) / duration if duration > 0 else 0,
-            'system_ids_seen': sorted(self.system_ids_seen)
+            'system_ids_seen': self.system_ids_seen
         }
 
 
@@ -216,6 +447,27 @@ class MultiDroneForwarder:
         print("="*80 + "\n")
 
 
+def start_log_listener() -> logging.handlers.QueueListener:
+    """Configure logging so forwarder threads only enqueue records
+
+    A QueueListener thread does the formatting and stderr writes, so logging
+    never stalls the forwarding loop. Call stop() on the result to flush it.
+    """
+    log_queue = queue.Queue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(message)s',  # final formatting happens in stream_handler
+        handlers=[logging.handlers.QueueHandler(log_queue)]
+    )
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
 def main():
     """Run the telemetry forwarder for 3 drones with system ID filtering"""
     
@@ -253,6 +505,7 @@ def main():
     print("Press Ctrl+C to stop")
     print("="*80 + "\n")
     
+    log_listener = start_log_listener()
     try:
         forwarder_manager.start_all()
         
@@ -266,6 +519,9 @@ def main():
         forwarder_manager.stop_all()
         forwarder_manager.print_stats()
         print("Done.")
+    finally:
+        # Flush any queued records however we exit
+        log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -12,142 +12,267 @@ What matters is that each port receives its CORRECT drone System ID (1, 2, or 3)
 and NOT the other drones' System IDs.
 """
 
+import argparse
+import heapq
+import io
+import select
+import socket
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
+import pymavlink
 from pymavlink import mavutil
-from collections import defaultdict
+from collections import Counter
 
-def test_connection(port, expected_system_id, test_duration=10):
-    """Test a single port connection"""
-    print(f"\n{'='*60}")
-    print(f"Testing Port {port} (expecting System ID {expected_system_id})")
-    print(f"{'='*60}")
+# Older pure-Python parsers re-slice their buffer per message (O(N^2) in bytes
+# buffered), which would dominate the collection window and skew msg/s
+MIN_PYMAVLINK_VERSION = (2, 4, 5)
+
+# Large enough to absorb telemetry bursts without kernel drops (which show up
+# as BAD_DATA resyncs and skew the contamination stats)
+RECV_BUFFER_SIZE = 4 << 20
+
+UDP_MAX_DATAGRAM = 65535
+
+# Upper bound on waiting for the drone's first heartbeat
+HEARTBEAT_TIMEOUT = 15
+
+# Messages buffered before folding them into the per-test Counters
+COUNT_BATCH_SIZE = 256
+
+def message_name(msg_id):
+    """Resolve a MAVLink message ID to its name in the active dialect"""
+    msg_class = mavutil.mavlink.mavlink_map.get(msg_id)
+    if msg_class is None:
+        return f"UNKNOWN_{msg_id}"
+    # Newer generators expose msgname, older ones name
+    return getattr(msg_class, 'msgname', None) or getattr(msg_class, 'name', f"UNKNOWN_{msg_id}")
+
+def check_pymavlink_version():
+    """Exit early if the installed pymavlink predates the linear-time parser"""
+    version = getattr(pymavlink, '__version__', '0')
+    parts = tuple(int(p) for p in version.split('.')[:3] if p.isdigit())
+    if parts < MIN_PYMAVLINK_VERSION:
+        minimum = '.'.join(map(str, MIN_PYMAVLINK_VERSION))
+        sys.exit(f"pymavlink {version} is too old - upgrade to >= {minimum} "
+                 f"(pip install -U pymavlink) for the linear-time parser")
+
+def wait_for_drone_heartbeat(conn, expected_system_id, timeout, out, stop=None):
+    """Block until a HEARTBEAT from expected_system_id arrives; False on timeout, a foreign drone or stop"""
+    waitables = [conn.port] if stop is None else [conn.port, stop]
+    now = time.monotonic  # local lookup in the loop; monotonic so NTP steps can't skew the timeout
+    deadline = now() + timeout
+    seen_gcs = False
+    
+    while True:
+        remaining = deadline - now()
+        if remaining <= 0:
+            break
+        
+        # Sleep in the kernel until a datagram arrives, then drain everything parsed from it
+        ready, _, _ = select.select(waitables, [], [], remaining)
+        if not ready:
+            continue
+        if stop is not None and stop in ready:
+            print("⚠️  Interrupted while waiting for heartbeat", file=out)
+            return False
+        
+        while (msg := conn.recv_msg()) is not None:
+            if msg.get_type() != 'HEARTBEAT':
+                continue
+            
+            received_system_id = msg.get_srcSystem()
+            if received_system_id == expected_system_id:
+                print(f"✓ Received heartbeat from correct System ID {expected_system_id}", file=out)
+                return True
+            
+            if received_system_id != 0:
+                print(f"❌ FAILED: Expected System ID {expected_system_id}, got {received_system_id}", file=out)
+                return False
+            
+            if not seen_gcs:
+                seen_gcs = True
+                print(f"ℹ️  Heartbeat from System ID 0 (GCS/Simulator) - this is normal", file=out)
+                print(f"   Waiting for drone heartbeat (System ID {expected_system_id})...", file=out)
+    
+    if seen_gcs:
+        print(f"❌ FAILED: Never received heartbeat from System ID {expected_system_id}", file=out)
+    else:
+        print(f"❌ FAILED: No heartbeat received within {timeout} seconds", file=out)
+    return False
+
+def test_connection(port, expected_system_id, test_duration=10, out=None, stop=None):
+    """Test a single port connection, writing the report to `out` (stdout by default)
+
+    `stop` is an optional socket; once it becomes readable the test gives up and returns False.
+    """
+    if out is None:
+        out = sys.stdout
+    
+    print(f"\n{'='*60}", file=out)
+    print(f"Testing Port {port} (expecting System ID {expected_system_id})", file=out)
+    print(f"{'='*60}", file=out)
     
     try:
         # Connect
         conn_str = f'udpin:127.0.0.1:{port}'
-        print(f"Connecting to {conn_str}...")
-        conn = mavutil.mavlink_connection(conn_str, source_system=255)
+        print(f"Connecting to {conn_str}...", file=out)
+        conn = mavutil.mavlink_connection(conn_str, source_system=255, dialect='common')
         
-        # Wait for heartbeat
-        print("Waiting for heartbeat from drone...")
-        hb = conn.wait_heartbeat(timeout=15)
+        # pymavlink keeps the UDP socket in conn.port
+        conn.port.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+        rcvbuf = conn.port.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        print(f"Receive buffer: {rcvbuf} bytes (capped by net.core.rmem_max)", file=out)
         
-        if not hb:
-            print(f"❌ FAILED: No heartbeat received within 15 seconds")
-            return False
-        
-        received_system_id = hb.get_srcSystem()
-        print(f"✓ Received heartbeat from System ID: {received_system_id}")
-        
-        # Check if system ID matches (allow 0 as it's GCS/simulator)
-        if received_system_id != expected_system_id and received_system_id != 0:
-            print(f"❌ FAILED: Expected System ID {expected_system_id}, got {received_system_id}")
+        # Wait for heartbeat
+        print("Waiting for heartbeat from drone...", file=out)
+        if not wait_for_drone_heartbeat(conn, expected_system_id, HEARTBEAT_TIMEOUT, out, stop):
             return False
         
-        if received_system_id == expected_system_id:
-            print(f"✓ Heartbeat from correct System ID")
+        # Read after traffic has arrived - the first MAVLink2 byte switches the connection to v2.0.
+        # mavnative only decodes MAVLink 1, so a 2.0 link is always parsed in pure Python.
+        if conn.WIRE_PROTOCOL_VERSION == "2.0":
+            print("Parser: pure-Python (MAVLink 2.0; mavnative only supports MAVLink 1)", file=out)
         else:
-            print(f"ℹ️  First heartbeat from System ID 0 (GCS/Simulator) - this is normal")
-            print(f"   Waiting for drone heartbeat (System ID {expected_system_id})...")
-            
-            # Try to get a heartbeat from the actual drone
-            start = time.time()
-            found_drone = False
-            while time.time() - start < 10:
-                hb = conn.recv_match(type='HEARTBEAT', blocking=True, timeout=1)
-                if hb and hb.get_srcSystem() == expected_system_id:
-                    print(f"✓ Found drone heartbeat from System ID {expected_system_id}")
-                    found_drone = True
-                    break
-            
-            if not found_drone:
-                print(f"❌ FAILED: Never received heartbeat from System ID {expected_system_id}")
-                return False
+            print(f"MAVLink wire protocol: {conn.WIRE_PROTOCOL_VERSION}", file=out)
+        
+        if test_duration <= 0:
+            print(f"\n✅ Port {port} heartbeat check PASSED (message collection skipped)", file=out)
+            return True
         
         # Collect messages for test duration
-        print(f"\nCollecting messages for {test_duration} seconds...")
-        start_time = time.time()
-        system_message_counts = defaultdict(int)  # Count messages per system ID
-        message_type_counts = defaultdict(int)
-        total_messages = 0
+        print(f"\nCollecting messages for {test_duration} seconds...", file=out)
+        now = time.monotonic  # local lookup in the loop; monotonic so NTP steps can't skew the window
+        start_time = now()
+        deadline = start_time + test_duration
+        system_message_counts = Counter()  # Count messages per system ID
+        message_type_counts = Counter()  # Keyed by msgId; names resolved when printing
+        bad_data_count = 0
+        
+        # (src_system, msg_id) pairs, folded into the Counters in C via update()
+        batch = []
+        
+        def flush_batch():
+            system_message_counts.update(src for src, _ in batch)
+            message_type_counts.update(msg_id for _, msg_id in batch)
+            batch.clear()
+        
+        # Read datagrams straight off pymavlink's (non-blocking) socket and parse
+        # each one in a single parse_buffer() call - the statistics don't need
+        # recv_match's filtering or per-message connection bookkeeping
+        sock = conn.port
+        recv_buf = bytearray(UDP_MAX_DATAGRAM)
+        recv_view = memoryview(recv_buf)
+        parse_buffer = conn.mav.parse_buffer
+        batch_append = batch.append
+        waitables = [sock] if stop is None else [sock, stop]
         
-        while time.time() - start_time < test_duration:
-            msg = conn.recv_match(blocking=True, timeout=1)
-            if msg:
-                msg_type = msg.get_type()
-                src_system = msg.get_srcSystem()
+        while True:
+            remaining = deadline - now()
+            if remaining <= 0:
+                break
+            
+            # Sleep until data arrives (or the window closes), then drain the burst
+            ready, _, _ = select.select(waitables, [], [], remaining)
+            if not ready:
+                continue
+            if stop is not None and stop in ready:
+                print("⚠️  Interrupted during message collection", file=out)
+                return False
+            
+            # Re-check the deadline per datagram so sustained traffic can't overrun the window
+            while now() < deadline:
+                try:
+                    n = sock.recv_into(recv_buf)
+                except BlockingIOError:
+                    break
                 
-                system_message_counts[src_system] += 1
-                message_type_counts[msg_type] += 1
-                total_messages += 1
+                for msg in parse_buffer(recv_view[:n]) or ():
+                    # Read straight from the header - int keys hash cheaper than type names
+                    header = msg._header
+                    msg_id = header.msgId
+                    if msg_id < 0:
+                        # BAD_DATA and other parser pseudo-messages have no real header -
+                        # don't count them as System ID 0
+                        bad_data_count += 1
+                        continue
+                    batch_append((header.srcSystem, msg_id))
+                
+                if len(batch) >= COUNT_BATCH_SIZE:
+                    flush_batch()
+        
+        flush_batch()
+        total_messages = sum(system_message_counts.values())
         
         # Results
-        elapsed = time.time() - start_time
+        elapsed = now() - start_time
         msg_rate = total_messages / elapsed
         
-        print(f"\n{'─'*60}")
-        print(f"Results for Port {port}:")
-        print(f"{'─'*60}")
-        print(f"Total messages received: {total_messages}")
-        print(f"Message rate: {msg_rate:.1f} msg/s")
-        print(f"Unique message types: {len(message_type_counts)}")
+        print(f"\n{'─'*60}", file=out)
+        print(f"Results for Port {port}:", file=out)
+        print(f"{'─'*60}", file=out)
+        print(f"Total messages received: {total_messages}", file=out)
+        print(f"Message rate: {msg_rate:.1f} msg/s", file=out)
+        print(f"Unique message types: {len(message_type_counts)}", file=out)
+        print(f"Bad data chunks: {bad_data_count}", file=out)
         
-        print(f"\nMessages by System ID:")
+        print(f"\nMessages by System ID:", file=out)
         for sys_id in sorted(system_message_counts.keys()):
             count = system_message_counts[sys_id]
             percentage = (count / total_messages * 100) if total_messages > 0 else 0
             
             if sys_id == 0:
-                print(f"  System ID {sys_id} (GCS/Simulator): {count:5d} ({percentage:5.1f}%) ✓ Normal")
+                print(f"  System ID {sys_id} (GCS/Simulator): {count:5d} ({percentage:5.1f}%) ✓ Normal", file=out)
             elif sys_id == expected_system_id:
-                print(f"  System ID {sys_id} (This Drone):     {count:5d} ({percentage:5.1f}%) ✓ Correct!")
+                print(f"  System ID {sys_id} (This Drone):     {count:5d} ({percentage:5.1f}%) ✓ Correct!", file=out)
             else:
-                print(f"  System ID {sys_id} (Other Drone):    {count:5d} ({percentage:5.1f}%) ✗ WRONG!")
+                print(f"  System ID {sys_id} (Other Drone):    {count:5d} ({percentage:5.1f}%) ✗ WRONG!", file=out)
         
         # Check for contamination from OTHER drones (not System ID 0)
         other_drones = [sid for sid in system_message_counts.keys() 
                        if sid != expected_system_id and sid != 0]
         
         if other_drones:
-            print(f"\n❌ FAILED: Port {port} receiving data from OTHER drones: {other_drones}")
-            print(f"   This indicates improper port configuration!")
-            print(f"   Each port should ONLY receive data from its designated drone.")
+            print(f"\n❌ FAILED: Port {port} receiving data from OTHER drones: {other_drones}", file=out)
+            print(f"   This indicates improper port configuration!", file=out)
+            print(f"   Each port should ONLY receive data from its designated drone.", file=out)
             return False
         
         # Check that we got messages from the expected drone
         if expected_system_id not in system_message_counts:
-            print(f"\n❌ FAILED: No messages received from System ID {expected_system_id}")
-            print(f"   Port {port} should be receiving data from this drone!")
+            print(f"\n❌ FAILED: No messages received from System ID {expected_system_id}", file=out)
+            print(f"   Port {port} should be receiving data from this drone!", file=out)
             return False
         
         drone_msg_count = system_message_counts[expected_system_id]
         drone_percentage = (drone_msg_count / total_messages * 100) if total_messages > 0 else 0
         
         if drone_percentage < 10:
-            print(f"\n⚠️  WARNING: Only {drone_percentage:.1f}% of messages from expected drone")
-            print(f"   Expected at least 10%. Check PX4 configuration.")
+            print(f"\n⚠️  WARNING: Only {drone_percentage:.1f}% of messages from expected drone", file=out)
+            print(f"   Expected at least 10%. Check PX4 configuration.", file=out)
         
         # Show top message types
-        print(f"\nTop 10 message types:")
-        sorted_msgs = sorted(message_type_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        for msg_type, count in sorted_msgs:
-            print(f"  {msg_type:30s} {count:6d}")
+        print(f"\nTop 10 message types:", file=out)
+        sorted_msgs = heapq.nlargest(10, message_type_counts.items(), key=itemgetter(1))
+        for msg_id, count in sorted_msgs:
+            print(f"  {message_name(msg_id):30s} {count:6d}", file=out)
         
-        print(f"\n✅ Port {port} test PASSED")
-        print(f"   ✓ Receiving data from correct drone (System ID {expected_system_id})")
-        print(f"   ✓ No contamination from other drones")
-        print(f"   ✓ System ID 0 messages present (normal simulator data)")
+        print(f"\n✅ Port {port} test PASSED", file=out)
+        print(f"   ✓ Receiving data from correct drone (System ID {expected_system_id})", file=out)
+        print(f"   ✓ No contamination from other drones", file=out)
+        print(f"   ✓ System ID 0 messages present (normal simulator data)", file=out)
         return True
         
     except Exception as e:
-        print(f"❌ FAILED: {e}")
+        print(f"❌ FAILED: {e}", file=out)
         import traceback
-        traceback.print_exc()
+        traceback.print_exc(file=out)
         return False
 
-def main():
-    print("""
+# Static text blocks, UTF-8 encoded once at import and written straight to
+# the binary stdout buffer
+BANNER = """
 ╔══════════════════════════════════════════════════════════════╗
 ║     PX4 Multi-Drone MAVLink Connection Test v2.0            ║
 ╚══════════════════════════════════════════════════════════════╝
@@ -170,41 +295,10 @@ Example of CORRECT behavior:
 Example of WRONG behavior:
   Port 14540 receives: System ID 0, 1, 2, 3 ✗ (contaminated!)
 
-""")
-    
-    input("Press ENTER to start test...")
-    
-    # Test configuration
-    tests = [
-        (14540, 1),  # Port 14540 should receive from System ID 1
-        (14541, 2),  # Port 14541 should receive from System ID 2
-        (14542, 3),  # Port 14542 should receive from System ID 3
-    ]
-    
-    results = []
-    
-    # Run tests
-    for port, expected_system_id in tests:
-        success = test_connection(port, expected_system_id, test_duration=10)
-        results.append((port, expected_system_id, success))
-        time.sleep(2)
-    
-    # Summary
-    print(f"\n{'='*60}")
-    print("SUMMARY")
-    print(f"{'='*60}")
-    
-    for port, system_id, success in results:
-        status = "✅ PASS" if success else "❌ FAIL"
-        print(f"Port {port} (Drone System ID {system_id}): {status}")
-    
-    all_passed = all(success for _, _, success in results)
-    
-    if all_passed:
-        print(f"\n{'='*60}")
-        print("🎉 ALL TESTS PASSED!")
-        print(f"{'='*60}")
-        print("""
+
+""".encode('utf-8')
+
+SUCCESS_NOTES = """
 Your PX4 multi-drone setup is correctly configured:
 ✓ Each drone is sending to its own port
 ✓ No data contamination between drones
@@ -216,13 +310,10 @@ display the correct data for each drone.
 
 NOTE: It's completely normal to see System ID 0 in the data.
 This represents simulator and ground station components.
-""")
-        return 0
-    else:
-        print(f"\n{'='*60}")
-        print("❌ SOME TESTS FAILED!")
-        print(f"{'='*60}")
-        print("""
+
+""".encode('utf-8')
+
+TROUBLESHOOTING = """
 TROUBLESHOOTING:
 
 The issue is cross-contamination between drones, NOT System ID 0.
@@ -251,7 +342,91 @@ The issue is cross-contamination between drones, NOT System ID 0.
      echo "Instance $i:"
      cat ~/workspace/PX4-Autopilot/build/px4_sitl_default/instance_$i/etc/extras.txt
    done
-""")
+
+""".encode('utf-8')
+
+def write_block(data):
+    """Write a pre-encoded block to stdout, after any pending text output"""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify per-drone MAVLink port isolation")
+    parser.add_argument(
+        '--duration', type=float, default=10,
+        help="seconds of traffic to collect per port; 0 only checks for the drone heartbeat"
+    )
+    args = parser.parse_args()
+    
+    write_block(BANNER)
+    
+    check_pymavlink_version()
+    
+    input("Press ENTER to start test...")
+    
+    # Test configuration
+    tests = [
+        (14540, 1),  # Port 14540 should receive from System ID 1
+        (14541, 2),  # Port 14541 should receive from System ID 2
+        (14542, 3),  # Port 14542 should receive from System ID 3
+    ]
+    
+    # Run all ports concurrently - each test is I/O bound on its own socket,
+    # so total time is that of the slowest port rather than the sum
+    print(f"Testing {len(tests)} ports in parallel...")
+    reports = {}
+    outcomes = {}
+    # Writing to stop_writer makes stop_reader readable, waking every worker's select()
+    stop_reader, stop_writer = socket.socketpair()
+    executor = ThreadPoolExecutor(max_workers=len(tests))
+    try:
+        futures = {}
+        for port, expected_system_id in tests:
+            reports[port] = io.StringIO()
+            future = executor.submit(
+                test_connection, port, expected_system_id, args.duration, reports[port], stop_reader
+            )
+            futures[future] = port
+        
+        for future in as_completed(futures):
+            outcomes[futures[future]] = future.result()
+    except KeyboardInterrupt:
+        stop_writer.send(b'\0')
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    stop_reader.close()
+    stop_writer.close()
+    
+    # Print each port's report in a deterministic order
+    results = []
+    for port, expected_system_id in tests:
+        sys.stdout.write(reports[port].getvalue())
+        results.append((port, expected_system_id, outcomes[port]))
+    
+    # Summary
+    print(f"\n{'='*60}")
+    print("SUMMARY")
+    print(f"{'='*60}")
+    
+    for port, system_id, success in results:
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"Port {port} (Drone System ID {system_id}): {status}")
+    
+    all_passed = all(success for _, _, success in results)
+    
+    if all_passed:
+        print(f"\n{'='*60}")
+        print("🎉 ALL TESTS PASSED!")
+        print(f"{'='*60}")
+        write_block(SUCCESS_NOTES)
+        return 0
+    else:
+        print(f"\n{'='*60}")
+        print("❌ SOME TESTS FAILED!")
+        print(f"{'='*60}")
+        write_block(TROUBLESHOOTING)
         return 1
 
 if __name__ == "__main__":